@@ -0,0 +1,2 @@
+# pytest inserts the directory of the rootmost conftest.py into sys.path,
+# so that the tests can import the gliff module without installing it.
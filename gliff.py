@@ -1,32 +1,217 @@
 import base64
+import binascii
 import json
+import math
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
 from decouple import config, UndefinedValueError
 from loguru import logger
 from etebase import Client, Account, Collection, Item, CollectionManager, ItemManager
 from PIL import Image
 from io import BytesIO
-from typing import Literal, Union, Optional, Any, List, Dict
+from types import MappingProxyType
+from typing import (
+    Literal,
+    Union,
+    Optional,
+    Any,
+    Callable,
+    Iterable,
+    Mapping,
+    List,
+    Dict,
+    Tuple,
+    Set,
+    Iterator,
+    SupportsIndex,
+)
+
+try:
+    import pybase64
+
+    def b64decode(s: Union[str, bytes], validate: bool = False) -> bytes:
+        return pybase64.b64decode(s, validate=validate)
+
+    def b64encode_as_string(s: Any) -> str:
+        return pybase64.b64encode_as_string(s)
+
+except ImportError:
+
+    def b64decode(s: Union[str, bytes], validate: bool = False) -> bytes:
+        return base64.b64decode(s, validate=validate)
+
+    def b64encode_as_string(s: Any) -> str:
+        return base64.b64encode(s).decode("ascii")
+
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def _loads(content: bytes) -> Any:
+        return orjson.loads(content)
+
+except ImportError:
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def _loads(content: bytes) -> Any:
+        return json.loads(content)
 
 
 ToolboxType = Literal["paintbrush", "spline", "boundingBox"]
 
+# number of threads used for concurrent, network-bound STORE requests
+_MAX_WORKERS = 8
+
+# number of projects (and decoded galleries) kept in memory, the least recently used are dropped first
+_MAX_CACHED_PROJECTS = 4
+
+# keys of the dictionaries passed to upload_images, one per image
+_IMAGE_REQUIRED_KEYS = frozenset({"name", "image"})
+_IMAGE_OPTIONAL_KEYS = frozenset({"image_labels", "metadata", "mode", "size"})
+
+# read-only templates for the annotations' default values, copied into each new annotation
+_DEFAULT_SPACE_TIME_INFO = MappingProxyType({"z": 0, "t": 0})
+_DEFAULT_BRUSH = MappingProxyType(
+    {
+        "radius": 0.5,
+        "type": "paint",
+        "color": "rgba(170, 0, 0, 0.5)",
+        "is3D": False,
+    }
+)
+
+
+class Gallery(list[Dict[str, Any]]):
+    """Project's gallery: the list of tiles stored in the project's content,
+    with a read-only index from tile id to position (the first tile with that id).
+
+    append/extend keep the index up to date, any other change to the list resets it
+    and it's rebuilt the next time it's used."""
+
+    def __init__(self, tiles: Iterable[Dict[str, Any]] = ()) -> None:
+        super().__init__(tiles)
+        self._tile_index: Optional[Dict[str, int]] = None
+
+    @property
+    def tile_index(self) -> Mapping[str, int]:
+        if self._tile_index is None:
+            self._tile_index = {}
+            for i, tile in enumerate(self):
+                self._tile_index.setdefault(tile["id"], i)
+        return MappingProxyType(self._tile_index)
+
+    def _reset_tile_index(self) -> None:
+        self._tile_index = None
+
+    def append(self, tile: Dict[str, Any]) -> None:
+        if self._tile_index is not None:
+            self._tile_index.setdefault(tile["id"], len(self))
+        super().append(tile)
+
+    def extend(self, tiles: Iterable[Dict[str, Any]]) -> None:
+        for tile in tiles:
+            self.append(tile)
+
+    def __iadd__(self, tiles: Iterable[Dict[str, Any]]) -> "Gallery":  # type: ignore[misc, override]
+        self.extend(tiles)
+        return self
+
+    def insert(self, index: SupportsIndex, tile: Dict[str, Any]) -> None:
+        super().insert(index, tile)
+        self._reset_tile_index()
+
+    def pop(self, index: SupportsIndex = -1) -> Dict[str, Any]:
+        tile = super().pop(index)
+        self._reset_tile_index()
+        return tile
+
+    def remove(self, tile: Dict[str, Any]) -> None:
+        super().remove(tile)
+        self._reset_tile_index()
+
+    def clear(self) -> None:
+        super().clear()
+        self._reset_tile_index()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._reset_tile_index()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._reset_tile_index()
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._reset_tile_index()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._reset_tile_index()
+
+    def __imul__(self, n: SupportsIndex) -> "Gallery":
+        super().__imul__(n)
+        self._reset_tile_index()
+        return self
+
 
 class Project:
     def __init__(self, account: Account) -> None:
         self.project_manager = self._fetch_project_manager(account)
         self.project = None
         self.item_manager = None
+        # projects recently fetched during this session, by uid, from least to most recently used
+        self._projects: OrderedDict[str, Tuple[Collection, ItemManager]] = OrderedDict()
+        # decoded contents of the projects in _projects, by uid
+        self._galleries: Dict[str, Gallery] = {}
+        # uids of the projects whose gallery has changed but hasn't been uploaded yet
+        self._pending_galleries: Set[str] = set()
 
     def _fetch_project_data(self, project_uid: str) -> None:
-        """Fetch project data if project is not set or has changed."""
+        """Fetch project data if project is not set or has changed.
+        The last _MAX_CACHED_PROJECTS projects used during this session are reused."""
 
         if (self.project is None) or (self.project.uid != project_uid):
 
-            logger.info("fetching project data...")
-            self.project = self._fetch_project(self.project_manager, project_uid)
-            self.item_manager = self._fetch_item_manager(self.project_manager, self.project)
-            logger.success("project data fetched.")
+            if project_uid in self._projects:
+                self._projects.move_to_end(project_uid)
+            else:
+                logger.debug("fetching project data...")
+                project = self._fetch_project(self.project_manager, project_uid)
+                item_manager = self._fetch_item_manager(self.project_manager, project)
+                self._projects[project_uid] = (project, item_manager)
+                logger.debug("project data fetched.")
+                self._evict_project_data(project_uid)
+
+            self.project, self.item_manager = self._projects[project_uid]
+
+    def _evict_project_data(self, project_uid: str) -> None:
+        """Drop the least recently used projects from the session's cache, down to _MAX_CACHED_PROJECTS,
+        except for project_uid and for the projects with gallery changes that haven't been uploaded yet."""
+
+        for uid in list(self._projects):
+            if len(self._projects) <= _MAX_CACHED_PROJECTS:
+                break
+            if (uid != project_uid) and (uid not in self._pending_galleries):
+                self._invalidate_project_data(uid)
+
+    def _invalidate_project_data(self, project_uid: str) -> None:
+        """Drop a project from the session's cache, so that it is fetched again on next use."""
+
+        self._projects.pop(project_uid, None)
+        self._galleries.pop(project_uid, None)
+        self._pending_galleries.discard(project_uid)
+        if (self.project is not None) and (self.project.uid == project_uid):
+            self.project = None
+            self.item_manager = None
 
     @staticmethod
     def _fetch_project_manager(account: Account) -> CollectionManager:
@@ -41,9 +226,9 @@ class Project:
         project_manager: CollectionManager
             Etebase's collection manager.
         """
-        logger.info("fetching project manager...")
+        logger.debug("fetching project manager...")
         project_manager = account.get_collection_manager()
-        logger.success("project manager fetched.")
+        logger.debug("project manager fetched.")
 
         return project_manager
 
@@ -62,9 +247,9 @@ class Project:
         project: Collection
             Project data.
         """
-        logger.info("fetching project...")
+        logger.debug("fetching project...")
         project = project_manager.fetch(project_uid)
-        logger.success("project fetched.")
+        logger.debug("project fetched.")
         return project
 
     @staticmethod
@@ -82,11 +267,25 @@ class Project:
         item_manager: ItemManager
             Etebase's item manager.
         """
-        logger.info("fetching item manager...")
+        logger.debug("fetching item manager...")
         item_manager = project_manager.get_item_manager(project)
-        logger.success("item manager fetched.")
+        logger.debug("item manager fetched.")
         return item_manager
 
+    @property
+    def gallery(self) -> Optional[Gallery]:
+        """Get the current project's decoded content, if it has been decoded already."""
+        return self._galleries.get(self.project.uid) if (self.project is not None) else None
+
+    @gallery.setter
+    def gallery(self, gallery: Optional[Gallery]) -> None:
+        """Set (or drop, if None) the current project's decoded content."""
+        if self.project is not None:
+            if gallery is None:
+                self._galleries.pop(self.project.uid, None)
+            else:
+                self._galleries[self.project.uid] = gallery
+
     @property
     def content(self) -> Any:
         """Get the project's content."""
@@ -96,14 +295,23 @@ class Project:
     def content(self, new_content: Any) -> None:
         """Set the project's content."""
         if self.project is not None:
+            self.gallery = None
+            self._pending_galleries.discard(self.project.uid)
             self.project.content = new_content
-            self.project_manager.transaction(self.project)
+            try:
+                self.project_manager.transaction(self.project)
+            except Exception:
+                # the project may be stale (e.g. its etag), so fetch it again on next use
+                self._invalidate_project_data(self.project.uid)
+                raise
 
 
 class Gliff:
     def __init__(self, access_key: Optional[str] = None, server_url: Optional[str] = None) -> None:
         self.account: Optional[Account] = None
         self.project: Optional[Project] = None
+        # number of open batch() blocks, while > 0 gallery uploads are deferred
+        self._batch_depth = 0
 
         if (access_key is not None) & (server_url is not None):
             self.login(access_key, server_url)
@@ -129,49 +337,137 @@ class Gliff:
             raise UndefinedValueError(f"{env_variable} not found.")
 
     @staticmethod
-    def base64_to_pil_image(img_base64: Union[str, bytes]) -> Image.Image:
-        """Convert a base64-encoded image into a PIL Image object"""
+    def _b64decode(img_base64: Union[str, bytes]) -> bytes:
+        """Decode base64 data, taking the validating (SIMD) fast path whenever the input
+        only has base64 characters."""
 
-        img_bytes = base64.b64decode(img_base64)
-        img_file = BytesIO(img_bytes)
-        return Image.open(img_file).convert("RGB")
+        try:
+            return b64decode(img_base64, validate=True)
+        except binascii.Error:
+            # tolerate line breaks and other characters outside the base64 alphabet
+            return b64decode(img_base64)
 
     @staticmethod
-    def pil_to_base64_image(img_pil: Image.Image, is_thumbnail: Optional[bool] = False) -> str:
-        """Convert a PIL Image object to a base64-encoded image (in bytes)"""
+    def _draft_image(img_pil: Image.Image, max_size: int) -> None:
+        """Let a JPEG image that hasn't been loaded yet decode at the smallest scale
+        (1/2, 1/4 or 1/8) that is still at least max_size pixels wide and high."""
+
+        if img_pil.format == "JPEG":
+            img_pil.draft("RGB", (max_size, max_size))
+
+    @classmethod
+    def base64_to_pil_image(
+        cls, img_base64: Union[str, bytes], max_size: Optional[int] = None, force_rgb: bool = True
+    ) -> Image.Image:
+        """Convert a base64-encoded image into a PIL Image object.
+        If max_size is set, JPEG images are decoded at a reduced scale (shrink-on-load).
+        If force_rgb is False, the image is returned in its own mode and its pixels are only
+        decoded when first accessed, so reading its size or format costs no decoding."""
+
+        img_file = BytesIO(cls._b64decode(img_base64))
+        img_pil = Image.open(img_file)
+        if max_size is not None:
+            cls._draft_image(img_pil, max_size)
+        if not force_rgb:
+            # the buffer is left open, to decode the pixels later on
+            return img_pil
+
+        with img_file:
+            # decode the pixels before the buffer is closed
+            img_pil.load()
+            return img_pil if img_pil.mode == "RGB" else img_pil.convert("RGB")
+
+    @staticmethod
+    def pil_to_base64_image(
+        img_pil: Image.Image, is_thumbnail: Optional[bool] = False, raw: bool = False, format: str = "PNG"
+    ) -> str:
+        """Convert a PIL Image object to a base64-encoded image (in bytes).
+        The image is encoded as PNG by default, or as JPEG if format is "JPEG".
+        If raw is True, the pixel data is encoded as is, skipping the compression
+        (a thumbnail can't be raw, as it is returned as a data URI)."""
+
+        if raw and is_thumbnail:
+            raise ValueError("raw pixel data can't be encoded as a thumbnail data URI")
 
-        img_file = BytesIO()
-        img_pil.save(img_file, format="PNG")
-        img_bytes = img_file.getvalue()
-        img_base64 = base64.b64encode(img_bytes).decode()
+        if raw:
+            img_base64 = b64encode_as_string(img_pil.tobytes())
+        else:
+            with BytesIO() as img_file:
+                if format == "JPEG":
+                    # optimize=True would run a second Huffman pass
+                    img_pil.save(img_file, format="JPEG", quality=80, optimize=False)
+                else:
+                    img_pil.save(img_file, format=format)
+                # encode straight from the buffer, without copying it to bytes first
+                with img_file.getbuffer() as img_bytes:
+                    img_base64 = b64encode_as_string(img_bytes)
         if is_thumbnail:
-            img_base64 = f"data:image/png;base64,{img_base64}"
+            img_base64 = f"data:image/{format.lower()};base64,{img_base64}"
         return img_base64
 
-    def _get_thumbnail_from_pil_image(self, img_pil: Image.Image) -> str:
-        """Get base64-encoded thumbnail (in bytes) from PIL image"""
+    @staticmethod
+    def _get_thumbnail_size(image_size: Tuple[int, int], max_size: Tuple[int, int] = (128, 128)) -> Tuple[int, int]:
+        """Get the size of the thumbnail Image.thumbnail would make, using the same aspect-ratio rounding."""
+
+        def round_aspect(number: float, key: Callable[[int], float]) -> int:
+            return max(min(math.floor(number), math.ceil(number), key=key), 1)
+
+        width, height = image_size
+        x, y = max_size
+        if x >= width and y >= height:
+            return width, height
 
-        size = 128, 128
-        img_pil.thumbnail(size, Image.ANTIALIAS)
-        return self.pil_to_base64_image(img_pil, True)
+        aspect = width / height
+        if x / y >= aspect:
+            x = round_aspect(y * aspect, key=lambda n: abs(aspect - n / y))
+        else:
+            y = round_aspect(x / aspect, key=lambda n: 0 if n == 0 else abs(aspect - x / n))
+        return x, y
+
+    def _get_thumbnail_from_pil_image(
+        self,
+        img_pil: Image.Image,
+        resample: Image.Resampling = Image.Resampling.BILINEAR,
+        image_size: Optional[Tuple[int, int]] = None,
+    ) -> str:
+        """Get base64-encoded thumbnail (in bytes) from PIL image.
+        Bilinear resampling is used by default, as it is adequate for a 128px preview.
+        image_size is the image's size before any draft (defaults to img_pil.size)."""
+
+        # same size as Image.thumbnail, but resizing into a new image leaves img_pil untouched
+        thumbnail_size = self._get_thumbnail_size(img_pil.size if image_size is None else image_size)
+        self._draft_image(img_pil, 256)
+        if img_pil.mode in ("P", "PA") or "transparency" in img_pil.info:
+            # palette images can only be resized with nearest-neighbour resampling
+            img_pil = img_pil.convert("RGBA")
+        # box-reduce to twice the target size before resampling
+        thumbnail = img_pil.resize(thumbnail_size, resample, reducing_gap=2.0)
+        if thumbnail.mode in ("RGBA", "LA"):
+            # JPEG has no alpha channel, so transparent areas are shown on a white background
+            background = Image.new("RGB", thumbnail.size, "white")
+            background.paste(thumbnail, mask=thumbnail.getchannel("A"))
+            thumbnail = background
+        elif thumbnail.mode not in ("RGB", "L"):
+            thumbnail = thumbnail.convert("RGB")
+        return self.pil_to_base64_image(thumbnail, True, format="JPEG")
 
     @staticmethod
     def _decode_content(content: bytes) -> Any:
         """Extract and decode project's or item's content, from binary to Dict."""
         try:
-            return json.loads(content.decode())
+            return _loads(content)
         except json.JSONDecodeError as e:
-            logger.warning(f"Error while accessing the project's content: {e}.")
+            logger.warning("Error while accessing the project's content: {}.", e)
 
     @staticmethod
     def _encode_content(decoded_content: Any) -> bytes:
         """Encode project's or item's content, from Dict to binary."""
-        return json.dumps(decoded_content, separators=(",", ":")).encode()
+        return _dumps(decoded_content)
 
     @staticmethod
     def get_current_time() -> int:
         """Get the current UTC time as an integer number expressed in milliseconds since the epoch."""
-        return int(round(time.time() * 1000))
+        return time.time_ns() // 1_000_000
 
     @staticmethod
     def is_empty_annotation(annotation: Dict[str, Any]) -> bool:
@@ -186,24 +482,16 @@ class Gliff:
             Boolean for wether the annotation passed as input is empty or not.
         """
         return (
-            (len(annotation["spline"]["coordinates"]) == 0)
-            & (len(annotation["brushStrokes"]) == 0)
-            & (annotation["boundingBox"]["coordinates"]["topLeft"]["x"] is None)
+            (not annotation["spline"]["coordinates"])
+            and (not annotation["brushStrokes"])
+            and (annotation["boundingBox"]["coordinates"]["topLeft"]["x"] is None)
         )
 
     @staticmethod
     def create_brush_stroke(
         coordinates: List[Union[int, float]],
-        space_time_info: Optional[Dict[str, Any]] = {
-            "z": 0,
-            "t": 0,
-        },
-        brush: Optional[Dict[str, Any]] = {
-            "radius": 0.5,
-            "type": "paint",
-            "color": "rgba(170, 0, 0, 0.5)",
-            "is3D": False,
-        },
+        space_time_info: Optional[Dict[str, Any]] = None,
+        brush: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Create a brush stroke annotation.
 
@@ -213,6 +501,8 @@ class Gliff:
             A list of (x,y) coordinates that defines the brush connected strokes.
         space_time_info:
             The z- (slice number) and t- (time point) coordinates (defaults to first slice and time point).
+        brush:
+            The brush's radius, type, color and whether it is 3D (defaults to a red paintbrush).
         Returns:
         -------
             The new brush-stroke object.
@@ -220,14 +510,14 @@ class Gliff:
 
         return {
             "coordinates": coordinates,
-            "spaceTimeInfo": space_time_info,
-            "brush": brush,
+            "spaceTimeInfo": dict(_DEFAULT_SPACE_TIME_INFO) if space_time_info is None else space_time_info,
+            "brush": dict(_DEFAULT_BRUSH) if brush is None else brush,
         }
 
     @staticmethod
     def create_spline(
         coordinates: List[Dict[str, Union[int, float]]],
-        space_time_info: Optional[Dict[str, Union[int, float]]] = {"z": 0, "t": 0},
+        space_time_info: Optional[Dict[str, Union[int, float]]] = None,
         is_closed: Optional[bool] = False,
     ) -> Dict[str, Any]:
         """Create a spline annotation.
@@ -244,13 +534,15 @@ class Gliff:
         -------
             The new spline object.
         """
+        if space_time_info is None:
+            space_time_info = dict(_DEFAULT_SPACE_TIME_INFO)
         return {"coordinates": coordinates, "spaceTimeInfo": space_time_info, "isClosed": is_closed}
 
     @staticmethod
     def create_bounding_box(
         top_left: Dict[str, Union[int, float]],
         bottom_right: Dict[str, Union[int, float]],
-        space_time_info: Optional[Dict[str, Union[int, float]]] = {"z": 0, "t": 0},
+        space_time_info: Optional[Dict[str, Union[int, float]]] = None,
     ) -> Dict[str, Any]:
         """Create a bounding-box annotation.
 
@@ -266,6 +558,8 @@ class Gliff:
         -------
             The new bouding-box object.
         """
+        if space_time_info is None:
+            space_time_info = dict(_DEFAULT_SPACE_TIME_INFO)
         return {
             "coordinates": {"topLeft": top_left, "bottomRight": bottom_right},
             "spaceTimeInfo": space_time_info,
@@ -279,21 +573,11 @@ class Gliff:
     @staticmethod
     def create_annotation(
         toolbox: ToolboxType,
-        labels: List[str] = [],
-        spline: Optional[Dict[str, Any]] = {
-            "coordinates": [],
-            "spaceTimeInfo": {"z": 0, "t": 0},
-            "isClosed": False,
-        },
-        bounding_box: Optional[Dict[str, Any]] = {
-            "coordinates": {
-                "topLeft": {"x": None, "y": None},
-                "bottomRight": {"x": None, "y": None},
-            },
-            "spaceTimeInfo": {"z": 0, "t": 0},
-        },
-        brush_strokes: Optional[List[Optional[Dict[str, Any]]]] = [],
-        parameters: Optional[Dict[str, Any]] = {},
+        labels: Optional[List[str]] = None,
+        spline: Optional[Dict[str, Any]] = None,
+        bounding_box: Optional[Dict[str, Any]] = None,
+        brush_strokes: Optional[List[Optional[Dict[str, Any]]]] = None,
+        parameters: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Create an annotation. Toolbox, the only required parameter, defines the annotation's type,
         which corresponds to the toolbox used for creating it. Depending on the value passed for toolbox,
@@ -320,22 +604,46 @@ class Gliff:
             Annotation (empty by default).
 
         """
+        if spline is None:
+            spline = {
+                "coordinates": [],
+                "spaceTimeInfo": dict(_DEFAULT_SPACE_TIME_INFO),
+                "isClosed": False,
+            }
+        if bounding_box is None:
+            bounding_box = {
+                "coordinates": {
+                    "topLeft": {"x": None, "y": None},
+                    "bottomRight": {"x": None, "y": None},
+                },
+                "spaceTimeInfo": dict(_DEFAULT_SPACE_TIME_INFO),
+            }
         return {
             "toolbox": toolbox,
-            "labels": labels,
+            "labels": [] if labels is None else labels,
             "spline": spline,
             "boundingBox": bounding_box,
-            "brushStrokes": brush_strokes,
-            "parameters": parameters,
+            "brushStrokes": [] if brush_strokes is None else brush_strokes,
+            "parameters": {} if parameters is None else parameters,
         }
 
-    def _process_image_data(self, image: Union[str, Image.Image]) -> Union[None, Dict[str, Any]]:
+    def _process_image_data(
+        self,
+        image: Union[str, bytes, Image.Image],
+        mode: Optional[str] = None,
+        size: Optional[Tuple[int, int]] = None,
+    ) -> Union[None, Dict[str, Any]]:
         """Create, encrypt and upload a new item to the STORE project.
 
         Parameters
         ----------
-        image: PIL.Image.Image or str
+        image: PIL.Image.Image, str or bytes
             Image uploaded to the new item.
+        mode: Optional[str]
+            PIL mode of the raw pixel data, when image is a bytes-like object
+            (without mode and size, the bytes are read as an image file).
+        size: Optional[Tuple[int, int]]
+            Width and height of the raw pixel data, when image is a bytes-like object.
         Returns
         -------
         image_data: Dict or None
@@ -343,20 +651,40 @@ class Gliff:
         """
 
         # check type of image and process it
-        if type(image) == Image.Image:
+        if isinstance(image, Image.Image):
             image_pil = image
             image = self.pil_to_base64_image(image)
-        elif isinstance(image, str):
-            image_pil = self.base64_to_pil_image(image)
+            width, height = image_pil.size
+        elif isinstance(image, (bytes, bytearray, memoryview)) and ((mode is None) != (size is None)):
+            logger.error("mode and size should be passed together for raw pixel data")
+            return None
+        elif isinstance(image, (bytes, bytearray, memoryview)) and (mode is not None) and (size is not None):
+            # Pillow shares memory with the buffer only for the modes it can map directly
+            # (e.g. "L" or "RGBA"), other modes such as "RGB" are copied
+            try:
+                image_pil = Image.frombuffer(mode, size, image, "raw", mode, 0, 1)
+            except ValueError as e:
+                logger.error(f"could not read the raw pixel data: {e}")
+                return None
+            image = self.pil_to_base64_image(image_pil)
+            width, height = image_pil.size
+        elif isinstance(image, (str, bytes, bytearray, memoryview)):
+            if isinstance(image, str):
+                image_pil = self.base64_to_pil_image(image, force_rgb=False)
+            else:
+                # encoded image file (e.g. PNG or JPEG), opened without a base64 round-trip
+                image_pil = Image.open(BytesIO(image))
+                image = b64encode_as_string(image)
+            # the size is read from the header, so the pixels are only needed for the thumbnail
+            width, height = image_pil.size
         else:
-            logger.error("image should be of type PIL.Image.Image or str")
+            logger.error("image should be of type PIL.Image.Image, str or bytes")
             return None
 
-        width, height = image_pil.size
         return {
             "width": width,
             "height": height,
-            "thumbnail": self._get_thumbnail_from_pil_image(image_pil),
+            "thumbnail": self._get_thumbnail_from_pil_image(image_pil, image_size=(width, height)),
             "encoded_image": self._encode_content([[image]]),
         }
 
@@ -384,7 +712,11 @@ class Gliff:
         self.project = Project(self.account)
 
     def logout(self) -> None:
-        """Log out of STORE."""
+        """Log out of STORE, uploading the gallery changes deferred by an unfinished batch() first."""
+
+        if (self.project is not None) and self.project._pending_galleries:
+            logger.warning("logging out within a batch, uploading the pending gallery changes...")
+            self.flush_gallery()
 
         logger.info("logging out...")
         if self.account is not None:
@@ -393,18 +725,38 @@ class Gliff:
             self.project = None
         logger.success("logged out.")
 
+    def refresh_project(self, project_uid: Optional[str] = None) -> None:
+        """Drop the data cached for a project (or for all projects, if project_uid is None),
+        so that it is fetched again on next use, e.g. to pick up changes made in the web app.
+        Gallery changes deferred by an open batch() for that project are discarded.
+
+        Parameters
+        ----------
+        project_uid: Optional[str]
+            Project's uid.
+        """
+
+        if self.project is None:
+            return None
+
+        project_uids = list(self.project._projects) if project_uid is None else [project_uid]
+        for uid in project_uids:
+            self.project._invalidate_project_data(uid)
+
     def _accept_pending_invitations(self) -> None:
         """Accept all pending invitations to join a STORE project."""
 
         invit_manager = self.account.get_invitation_manager()
 
-        invitations = invit_manager.list_incoming()
-        logger.info(f"pending invitations: {invitations}")
+        invitations = tuple(invit_manager.list_incoming().data)
+        logger.info("pending invitations: {}", invitations)
 
-        for invitation in list(invitations.data):
+        if not invitations:
+            return
 
-            invit_manager.accept(invitation)
-            logger.success("invitations accepted.")
+        with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(invitations))) as executor:
+            list(executor.map(invit_manager.accept, invitations))
+        logger.success("{} invitations accepted.", len(invitations))
 
     def _leave_project(self, project_uid: str) -> None:
         """Leave a project.
@@ -421,9 +773,10 @@ class Gliff:
 
         self.project._fetch_project_data(project_uid)
 
-        logger.info(f"leaving project, uid: {project_uid}...")
+        logger.info("leaving project, uid: {}...", project_uid)
         memeber_manager = self.project.project_manager.get_member_manager(self.project.project)
         memeber_manager.leave()
+        self.project._invalidate_project_data(project_uid)
         logger.info("left project.")
 
     def _has_project(self) -> bool:
@@ -453,20 +806,20 @@ class Gliff:
         self.project._fetch_project_data(project_uid)
 
         try:
-            logger.info(f"fetching item, uid: {item_uid}...")
+            logger.debug("fetching item, uid: {}...", item_uid)
             item = self.project.item_manager.fetch(item_uid)
-            logger.info("item fetched.")
+            logger.debug("item fetched.")
             return item
         except Exception as e:
-            logger.error(f"error while fetching image: {e}.")
+            logger.error("error while fetching image: {}.", e)
 
     @staticmethod
     def _create_tile_update(
         image_labels: Optional[List[str]] = None,
-        metadata: Dict[str, Any] = {},
-        annotation_uid: Dict[str, str] = {},
-        audit_uid: Dict[str, str] = {},
-        annotation_complete: Dict[str, bool] = {},
+        metadata: Optional[Dict[str, Any]] = None,
+        annotation_uid: Optional[Dict[str, str]] = None,
+        audit_uid: Optional[Dict[str, str]] = None,
+        annotation_complete: Optional[Dict[str, bool]] = None,
     ) -> Dict[str, Any]:
         """Create gallery tile with data to update.
 
@@ -490,10 +843,10 @@ class Gliff:
         """
 
         tile = {
-            "fileInfo": metadata,
-            "annotationUID": annotation_uid,
-            "auditUID": audit_uid,
-            "annotationComplete": annotation_complete,
+            "fileInfo": metadata or {},
+            "annotationUID": annotation_uid or {},
+            "auditUID": audit_uid or {},
+            "annotationComplete": annotation_complete or {},
         }
 
         if image_labels is not None:
@@ -501,15 +854,55 @@ class Gliff:
 
         return tile
 
+    @staticmethod
+    def _apply_tile_update(
+        tile: Dict[str, Any],
+        fileInfo: Optional[Dict[str, Any]] = None,
+        annotationUID: Optional[Dict[str, str]] = None,
+        auditUID: Optional[Dict[str, str]] = None,
+        annotationComplete: Optional[Dict[str, bool]] = None,
+        imageLabels: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Update a gallery tile in place with the data created by _create_tile_update.
+
+        Parameters:
+        -----------
+        tile: Dict
+            Gallery tile.
+        fileInfo, annotationUID, auditUID, annotationComplete, imageLabels:
+            Tile fields to update (the dictionaries are merged, the labels are replaced).
+
+        Returns:
+        --------
+        tile: Dict
+            Updated gallery tile.
+        """
+
+        # the tile is cached, so it mustn't share the caller's (mutable) labels and metadata
+        if fileInfo is not None:
+            tile["fileInfo"].update(deepcopy(fileInfo))
+        if annotationUID is not None:
+            tile["annotationUID"].update(annotationUID)
+        if auditUID is not None:
+            tile["auditUID"].update(auditUID)
+        if annotationComplete is not None:
+            if "annotationComplete" not in tile:
+                tile["annotationComplete"] = {}
+            tile["annotationComplete"].update(annotationComplete)
+        if imageLabels is not None:
+            tile["imageLabels"] = list(imageLabels)
+        return tile
+
     @staticmethod
     def _create_new_tile(
         image_item_uid: str,
         thumbnail: str,
-        image_labels: List[str] = [],
-        metadata: Dict[str, Any] = {},
-        annotation_uid: Dict[str, str] = {},
-        audit_uid: Dict[str, str] = {},
-        annotation_complete: Dict[str, bool] = {},
+        image_labels: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        annotation_uid: Optional[Dict[str, str]] = None,
+        audit_uid: Optional[Dict[str, str]] = None,
+        annotation_complete: Optional[Dict[str, bool]] = None,
     ) -> Dict[str, Any]:
         """Create new gallery tile.
 
@@ -536,15 +929,16 @@ class Gliff:
             Gallery tile (empty by default).
         """
 
+        # the tile is cached, so it mustn't share the caller's (mutable) labels and metadata
         return {
             "id": image_item_uid,
             "thumbnail": thumbnail,
-            "imageLabels": image_labels,
-            "fileInfo": metadata,
+            "imageLabels": list(image_labels or []),
+            "fileInfo": deepcopy(metadata or {}),
             "imageUID": image_item_uid,
-            "annotationUID": annotation_uid,
-            "auditUID": audit_uid,
-            "annotationComplete": annotation_complete,
+            "annotationUID": dict(annotation_uid or {}),
+            "auditUID": dict(audit_uid or {}),
+            "annotationComplete": dict(annotation_complete or {}),
         }
 
     def _create_gallery_tile(self, tile: Dict[str, Any]) -> None:
@@ -556,31 +950,112 @@ class Gliff:
             New gallery tile.
         """
 
+        self._create_gallery_tiles([tile])
+
+    def _create_gallery_tiles(self, tiles: List[Dict[str, Any]]) -> None:
+        """Create, ecrypt and upload several new tiles to the STORE project, decoding
+        and encoding the gallery and uploading the project only once.
+
+        Parameters
+        ----------
+        tiles: List[Dict]
+            New gallery tiles.
+        """
+
         logger.info("updating gallery's content..")
 
         try:
             gallery = self._get_gallery()
 
-            gallery.append(tile)
+            gallery.extend(tiles)
 
             self._set_gallery(gallery)
         except Exception as e:
-            logger.error(f"Error while creating a gallery's tile: {e}")
+            logger.error("Error while creating a gallery's tile: {}", e)
 
-    def _get_gallery(self) -> List[Dict[str, Any]]:
-        return self._decode_content(self.project.content)
+    def _get_gallery(self) -> Gallery:
+        """Get the project's gallery, decoding the project's content only if it has changed."""
+        if self.project.gallery is None:
+            self.project.gallery = Gallery(self._decode_content(self.project.content))
+        return self.project.gallery
 
     @staticmethod
-    def _find_gallery_tile(gallery: List[Dict[str, Any]], id: str) -> Union[int, None]:
+    def _find_gallery_tile(gallery: Gallery, id: str) -> Union[int, None]:
         """Get the index for the gallery tile corresponding to the image item with
         uid equal to the galler's id (or equal to the imageUID field)."""
-        for i, tile in enumerate(gallery):
-            if tile["id"] == id:
-                return i
-        return None
+        return gallery.tile_index.get(id)
 
-    def _set_gallery(self, gallery: List[Dict[str, Any]]) -> None:
+    def _set_gallery(self, gallery: Gallery) -> None:
+        if self._batch_depth > 0:
+            # upload it when the batch ends
+            self.project.gallery = gallery
+            self.project._pending_galleries.add(self.project.project.uid)
+            return
+
+        # keep the decoded gallery only once it has been uploaded
+        self.project.gallery = None
         self.project.content = self._encode_content(gallery)
+        self.project.gallery = gallery
+
+    def flush_gallery(self) -> None:
+        """Upload the galleries changed within a batch, encoding each of them only once.
+        As for the uploads made outside a batch, errors are logged: the gallery changes of a project
+        that fails to upload are dropped, and the project is fetched again on next use."""
+
+        if self.project is None:
+            return None
+
+        for project_uid in list(self.project._pending_galleries):
+            logger.info("uploading gallery, project uid: {}...", project_uid)
+            project, _ = self.project._projects[project_uid]
+            try:
+                project.content = self._encode_content(self.project._galleries[project_uid])
+                self.project.project_manager.transaction(project)
+            except Exception as e:
+                logger.error("Error while uploading a gallery: {}", e)
+                # the project may be stale (e.g. its etag), so fetch it again on next use
+                self.project._invalidate_project_data(project_uid)
+                continue
+            self.project._pending_galleries.discard(project_uid)
+            logger.success("gallery uploaded.")
+
+    def _discard_pending_galleries(self) -> None:
+        """Drop the galleries changed within a batch without uploading them."""
+
+        if self.project is None:
+            return None
+
+        for project_uid in list(self.project._pending_galleries):
+            logger.warning("discarding the gallery changes, project uid: {}", project_uid)
+            self.project._invalidate_project_data(project_uid)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer the gallery uploads made within the block to its end, e.g.
+
+            with gliff.batch():
+                for name, image in images:
+                    gliff.upload_image(project_uid, name, image)
+
+        decodes, encodes and uploads the project's gallery once rather than once per image.
+        Blocks can be nested, the galleries are uploaded when the outermost block ends.
+
+        If an exception leaves the outermost block, the gallery changes are discarded instead.
+        The items created within the block have already been uploaded, but the gallery has no
+        tiles for them.
+        """
+
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._discard_pending_galleries()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.flush_gallery()
 
     def _update_gallery_tile(self, item_uid: str, tile_data: Dict[str, Any]) -> None:
         """Update a tile in the STORE project.
@@ -592,29 +1067,6 @@ class Gliff:
             Gallery tile data.
         """
 
-        def update_tile(
-            tile: Dict[str, Any],
-            metadata: Optional[Dict[str, Any]] = None,
-            annotationUID: Optional[Dict[str, str]] = None,
-            auditUID: Optional[Dict[str, str]] = None,
-            annotationComplete: Optional[Dict[str, str]] = None,
-            imageLabels: Optional[List[str]] = None,
-            **kwargs: Any,
-        ) -> Dict[str, Any]:
-            if metadata is not None:
-                tile["fileInfo"].update(metadata)
-            if annotationUID is not None:
-                tile["annotationUID"].update(annotationUID)
-            if auditUID is not None:
-                tile["auditUID"].update(auditUID)
-            if annotationComplete is not None:
-                if "annotationComplete" not in tile:
-                    tile["annotationComplete"] = {}
-                tile["annotationComplete"].update(annotationComplete)
-            if imageLabels is not None:
-                tile["imageLabels"] = imageLabels
-            return tile
-
         logger.info("updating gallery's tile..")
 
         try:
@@ -622,11 +1074,11 @@ class Gliff:
 
             tile_index = self._find_gallery_tile(gallery, item_uid)
 
-            gallery[tile_index] = update_tile({**gallery[tile_index]}, **tile_data)
+            self._apply_tile_update(gallery[tile_index], **tile_data)
 
             self._set_gallery(gallery)
         except Exception as e:
-            logger.error(f"Error while updating a gallery's tile: {e}")
+            logger.error("Error while updating a gallery's tile: {}", e)
 
         logger.info("updated gallery's tile")
 
@@ -634,9 +1086,11 @@ class Gliff:
         self,
         project_uid: str,
         name: str,
-        image: Union[str, Image.Image],
-        image_labels: List[str] = [],
-        metadata: Dict[str, Any] = {},
+        image: Union[str, bytes, Image.Image],
+        image_labels: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+        size: Optional[Tuple[int, int]] = None,
     ) -> Union[str, None]:
         """Create, encrypt and upload a new item to the STORE project.
 
@@ -646,66 +1100,131 @@ class Gliff:
             Project's uid.
         name: str
             Name of the new item.
-        image: Union[str, Image.Image]
-            2D image to upload to the new item.
+        image: Union[str, bytes, Image.Image]
+            2D image to upload to the new item (base64-encoded, image file bytes, raw pixel data or PIL image).
         image_labels: List[str]
             Image labels (optional).
         metadata: Dict
             Metadata (optional).
+        mode: Optional[str]
+            PIL mode of the raw pixel data, e.g. "RGB" (required when image is raw pixel data).
+        size: Optional[Tuple[int, int]]
+            Width and height of the raw pixel data (required when image is raw pixel data).
         -------
         item_uid: Union[str, None]
             New image item's uid.
         """
 
-        logger.info("creating new image item...")
+        item_uids = self.upload_images(
+            project_uid,
+            [
+                {
+                    "name": name,
+                    "image": image,
+                    "image_labels": image_labels,
+                    "metadata": metadata,
+                    "mode": mode,
+                    "size": size,
+                }
+            ],
+        )
+        return None if item_uids is None else item_uids[0]
+
+    def upload_images(self, project_uid: str, images: List[Dict[str, Any]]) -> Union[List[Optional[str]], None]:
+        """Create, encrypt and upload several new items to the STORE project, with a single
+        item transaction and a single gallery update.
+
+        Parameters
+        ----------
+        project_uid: str
+            Project's uid.
+        images: List[Dict]
+            One dictionary per image, with the same keys as upload_image's parameters:
+            name and image, and optionally image_labels, metadata, mode and size.
+            Entries with missing or unknown keys are skipped.
+        Returns
+        -------
+        item_uids: Union[List[Union[str, None]], None]
+            New image items' uids, in the same order as images (None for images that couldn't be processed).
+
+        All the encoded images are kept in memory until the transaction, so a large number of
+        large images should be split across several calls.
+        """
+
+        logger.info("creating {} new image item(s)...", len(images))
 
         if not self._has_project():
             return None
 
         self.project._fetch_project_data(project_uid)
 
-        # process the input image
-        image_data = self._process_image_data(image)
-        if image_data is None:
-            return None
-
-        # create a new gliff.image item and upload it to the project
         ctime = self.get_current_time()
-        item_metadata = {
-            "type": "gliff.image",
-            "imageName": name,
-            "createdTime": ctime,
-            "modifiedTime": ctime,
-        }
-
-        item = self.project.item_manager.create(item_metadata, image_data["encoded_image"])
-        self.project.item_manager.transaction([item])
+        items: List[Item] = []
+        new_tiles: List[Dict[str, Any]] = []
+        item_uids: List[Optional[str]] = []
+        for image in images:
+            if not isinstance(image, dict):
+                logger.error("image entry should be a dictionary, got {}", type(image).__name__)
+                item_uids.append(None)
+                continue
+            missing_keys = _IMAGE_REQUIRED_KEYS - image.keys()
+            unknown_keys = image.keys() - _IMAGE_REQUIRED_KEYS - _IMAGE_OPTIONAL_KEYS
+            if missing_keys or unknown_keys:
+                logger.error(
+                    "invalid image entry, missing keys: {}, unknown keys: {}",
+                    sorted(missing_keys),
+                    sorted(unknown_keys),
+                )
+                item_uids.append(None)
+                continue
+
+            # process the input image
+            image_data = self._process_image_data(image["image"], image.get("mode"), image.get("size"))
+            if image_data is None:
+                item_uids.append(None)
+                continue
+
+            # create a new gliff.image item
+            item_metadata = {
+                "type": "gliff.image",
+                "imageName": image["name"],
+                "createdTime": ctime,
+                "modifiedTime": ctime,
+            }
+            item = self.project.item_manager.create(item_metadata, image_data["encoded_image"])
+            items.append(item)
+            item_uids.append(item.uid)
+
+            # create a new tile for the project's content (or gallery)
+            new_tiles.append(
+                self._create_new_tile(
+                    item.uid,
+                    image_data["thumbnail"],
+                    image.get("image_labels") or [],
+                    metadata={
+                        "imageName": image["name"],
+                        "width": image_data["width"],
+                        "height": image_data["height"],
+                        **(image.get("metadata") or {}),
+                    },
+                )
+            )
 
-        logger.success("image item created.")
-
-        # create a new tile and add this to the project's content (or gallery)
-        new_tile = self._create_new_tile(
-            item.uid,
-            image_data["thumbnail"],
-            image_labels,
-            metadata={
-                "imageName": name,
-                "width": image_data["width"],
-                "height": image_data["height"],
-                **metadata,
-            },
-        )
+        if items:
+            # upload the new items, then add their tiles to the gallery
+            self.project.item_manager.transaction(items)
+            logger.success("{} image item(s) created.", len(items))
 
-        self._create_gallery_tile(new_tile)
+            self._create_gallery_tiles(new_tiles)
 
-        return item.uid
+        return item_uids
 
     def update_metadata_and_labels(
         self,
         project_uid: str,
         item_uid: str,
         image_labels: Union[List[str], None] = None,
-        metadata: Dict[str, Any] = {},
+        metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
         """Create, encrypt and upload a new item to the STORE project.
 
@@ -730,10 +1249,10 @@ class Gliff:
 
         item = self.get_project_item(project_uid, item_uid)
 
-        item.meta = {
-            **item.meta,
-            "modifiedTime": self.get_current_time(),
-        }
+        # item.meta is decoded anew on each access, so set the updated copy back
+        meta = item.meta
+        meta["modifiedTime"] = self.get_current_time()
+        item.meta = meta
 
         self.project.item_manager.transaction([item])
 
@@ -762,34 +1281,42 @@ class Gliff:
 
         self.project._fetch_project_data(project_uid)
 
-        logger.info(f"fetching item's image data, uid: {item_uid}...")
+        logger.info("fetching item's image data, uid: {}...", item_uid)
 
         try:
             item = self.get_project_item(project_uid, item_uid)
             decoded_content = self._decode_content(item.content)
 
-            image_data: List[List[Image.Image]] = []
-            for i_slice in range(len(decoded_content)):
-                image_data.append([])
-                for i_channel in range(len(decoded_content[i_slice])):
-                    image_data[i_slice].append(self.base64_to_pil_image(decoded_content[i_slice][i_channel]))
-
-            num_channels = len(image_data[0])
+            # only the first slice is returned, so only its channels are decoded;
+            # identical channels (e.g. a greyscale image stored as RGB) are decoded once
+            channels = decoded_content[0]
+            distinct_channels = list(dict.fromkeys(channels))
+            if len(distinct_channels) <= 1:
+                decoded_channels = {channel: self.base64_to_pil_image(channel) for channel in distinct_channels}
+            else:
+                # Pillow releases the GIL while decoding, so the channels are decoded concurrently
+                with ThreadPoolExecutor(max_workers=len(distinct_channels)) as executor:
+                    decoded_channels = dict(
+                        zip(distinct_channels, executor.map(self.base64_to_pil_image, distinct_channels))
+                    )
+            image_data = [decoded_channels[channel] for channel in channels]
+
+            num_channels = len(image_data)
             if num_channels == 1:
-                image_pil = image_data[0][0]
+                image_pil = image_data[0]
 
             elif num_channels == 3:
-                red, green, blue = [img.getchannel(i) for i, img in enumerate(image_data[0])]
+                red, green, blue = [img.getchannel(i) for i, img in enumerate(image_data)]
                 image_pil = Image.merge("RGB", (red, green, blue))
 
             else:
-                logger.error(f"Images with {num_channels} channels are not supported.")
+                logger.error("Images with {} channels are not supported.", num_channels)
                 return None
 
             logger.success("image data fetched.")
             return image_pil
         except Exception as e:
-            logger.error(f"Error while fetching an item's image data: {e}")
+            logger.error("Error while fetching an item's image data: {}", e)
         return None
 
     def get_metadata_and_labels(self, project_uid: str, item_uid: str) -> Union[Dict[str, Any], None]:
@@ -819,10 +1346,11 @@ class Gliff:
 
             index = self._find_gallery_tile(gallery, item_uid)
 
-            return gallery[index]["fileInfo"], gallery[index]["imageLabels"]
+            # return copies, so that changing them doesn't change the cached gallery
+            return deepcopy(gallery[index]["fileInfo"]), list(gallery[index]["imageLabels"])
 
         except Exception as e:
-            logger.error(f"error while retrieving image item's metadata: {e}")
+            logger.error("error while retrieving image item's metadata: {}", e)
         return None
 
     def _get_annotation_uid(self, project_uid: str, image_item_uid: str, username: str) -> Union[str, None]:
@@ -849,13 +1377,10 @@ class Gliff:
 
         gallery = self._get_gallery()
 
-        item_uid = None
-        for tile in gallery:
-            if tile["id"] == image_item_uid:
-                if username in tile["annotationUID"]:
-                    item_uid = tile["annotationUID"][username]
-                    break
-        return item_uid
+        index = self._find_gallery_tile(gallery, image_item_uid)
+        if index is None:
+            return None
+        return gallery[index]["annotationUID"].get(username)
 
     def _create_annotation_item(
         self,
@@ -863,7 +1388,7 @@ class Gliff:
         image_item_uid: str,
         username: str,
         annotations: List[Dict[str, Any]],
-        metadata: Dict[str, Any] = {},
+        metadata: Optional[Dict[str, Any]] = None,
     ) -> str:
         """Create, encrypt and upload a new item to the STORE project.
 
@@ -920,7 +1445,7 @@ class Gliff:
         image_item_uid: str,
         annotation_item_uid: str,
         annotations: List[Dict[str, Any]],
-        metadata: Dict[str, Any] = {},
+        metadata: Optional[Dict[str, Any]] = None,
     ) -> str:
         """Create, encrypt and upload a new item to the STORE project.
 
@@ -948,18 +1473,21 @@ class Gliff:
 
         self.project._fetch_project_data(project_uid)
 
-        logger.info(f"updating annotation item, uid: {annotation_item_uid}...")
+        logger.info("updating annotation item, uid: {}...", annotation_item_uid)
 
         item = self.get_project_item(project_uid, annotation_item_uid)
 
         # if the last annotation is empty, remove it
         prev_annotations = self._decode_content(item.content)
-        if len(prev_annotations) > 0 & self.is_empty_annotation(prev_annotations[-1]):
+        if prev_annotations and self.is_empty_annotation(prev_annotations[-1]):
             prev_annotations.pop()
 
-        item.meta = {**item.meta, "modifiedTime": self.get_current_time()}
+        meta = item.meta
+        meta["modifiedTime"] = self.get_current_time()
+        item.meta = meta
 
-        item.content = self._encode_content([*prev_annotations, *annotations])
+        prev_annotations.extend(annotations)
+        item.content = self._encode_content(prev_annotations)
 
         self.project.item_manager.transaction([item])
 
@@ -977,7 +1505,7 @@ class Gliff:
         image_item_uid: str,
         username: str,
         annotations: List[Dict[str, Any]],
-        metadata: Dict[str, Any] = {},
+        metadata: Optional[Dict[str, Any]] = None,
     ) -> str:
         """Encrypt and upload an annotation to the STORE project.
 
@@ -1041,7 +1569,7 @@ class Gliff:
                 item = self.get_project_item(project_uid, annotation_item_uid)
                 return self._decode_content(item.content)
         except Exception as e:
-            logger.error(f"Error while fetching an item's annotations: {e}")
+            logger.error("Error while fetching an item's annotations: {}", e)
         return None
 
     def __del__(self) -> None:
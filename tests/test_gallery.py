@@ -0,0 +1,403 @@
+import random
+from io import BytesIO
+from itertools import count
+from typing import Any, Callable, Dict, List, Set
+
+import pytest
+from PIL import Image
+
+from gliff import Gallery, Gliff, Project, b64decode, b64encode_as_string
+
+_uids = count()
+
+
+class FakeItem:
+    def __init__(self, meta: Dict[str, Any], content: bytes) -> None:
+        self.uid = f"item-{next(_uids)}"
+        self.meta = meta
+        self.content = content
+
+
+class FakeItemManager:
+    def __init__(self) -> None:
+        self.items: Dict[str, FakeItem] = {}
+        self.transactions = 0
+
+    def create(self, meta: Dict[str, Any], content: bytes) -> FakeItem:
+        return FakeItem(meta, content)
+
+    def transaction(self, items: List[FakeItem]) -> None:
+        self.transactions += 1
+        for item in items:
+            self.items[item.uid] = item
+
+    def fetch(self, uid: str) -> FakeItem:
+        return self.items[uid]
+
+
+class FakeCollection:
+    def __init__(self, uid: str, content: bytes) -> None:
+        self.uid = uid
+        self.content = content
+
+
+class FakeCollectionManager:
+    """Keeps the projects' content "on the server", fetched and uploaded as a whole."""
+
+    def __init__(self) -> None:
+        self.server: Dict[str, bytes] = {}
+        self.item_manager = FakeItemManager()
+        self.fetches = 0
+        self.uploads: List[str] = []
+        self.failing_projects: Set[str] = set()
+
+    def fetch(self, uid: str) -> FakeCollection:
+        self.fetches += 1
+        return FakeCollection(uid, self.server.setdefault(uid, b"[]"))
+
+    def get_item_manager(self, project: FakeCollection) -> FakeItemManager:
+        return self.item_manager
+
+    def transaction(self, project: FakeCollection) -> None:
+        if project.uid in self.failing_projects:
+            raise RuntimeError("stale collection")
+        self.server[project.uid] = project.content
+        self.uploads.append(project.uid)
+
+
+class FakeAccount:
+    def get_collection_manager(self) -> FakeCollectionManager:
+        return FakeCollectionManager()
+
+
+def make_gliff() -> Gliff:
+    gliff = Gliff()
+    gliff.project = Project(FakeAccount())
+    return gliff
+
+
+def uploaded_gallery(gliff: Gliff, project_uid: str = "project") -> Dict[str, Dict[str, Any]]:
+    """Decode the gallery as it was last uploaded, by tile id."""
+    content = gliff.project.project_manager.server[project_uid]
+    return {tile["id"]: tile for tile in Gliff._decode_content(content)}
+
+
+def test_tiles_dont_share_the_callers_labels_and_metadata() -> None:
+    gliff = make_gliff()
+    image = Image.new("RGB", (8, 8))
+
+    labels = ["cat"]
+    metadata = {"source": {"camera": "a"}}
+    uid_a = gliff.upload_image("project", "a", image, labels, metadata)
+    labels.append("dog")
+    metadata["source"]["camera"] = "b"
+    uid_b = gliff.upload_image("project", "b", image, labels, metadata)
+
+    gallery = uploaded_gallery(gliff)
+    assert gallery[uid_a]["imageLabels"] == ["cat"]
+    assert gallery[uid_a]["fileInfo"]["source"] == {"camera": "a"}
+    assert gallery[uid_b]["imageLabels"] == ["cat", "dog"]
+    assert gallery[uid_b]["fileInfo"]["source"] == {"camera": "b"}
+
+
+def test_get_metadata_and_labels_returns_copies() -> None:
+    gliff = make_gliff()
+    uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)), ["cat"], {"source": {"camera": "a"}})
+
+    metadata, labels = gliff.get_metadata_and_labels("project", uid_a)
+    labels.append("LOCAL-ONLY")
+    metadata["source"]["camera"] = "LOCAL-ONLY"
+    uid_b = gliff.upload_image("project", "b", Image.new("RGB", (8, 8)))
+
+    gallery = uploaded_gallery(gliff)
+    assert gallery[uid_a]["imageLabels"] == ["cat"]
+    assert gallery[uid_a]["fileInfo"]["source"] == {"camera": "a"}
+    assert gallery[uid_b]["imageLabels"] == []
+
+
+def test_annotation_is_only_linked_to_its_image() -> None:
+    gliff = make_gliff()
+    uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)))
+    uid_b = gliff.upload_image("project", "b", Image.new("RGB", (8, 8)))
+
+    annotation_uid = gliff.upload_annotation("project", uid_a, "alice", [gliff.create_annotation("paintbrush")])
+
+    gallery = uploaded_gallery(gliff)
+    assert gallery[uid_a]["annotationUID"] == {"alice": annotation_uid}
+    assert gallery[uid_b]["annotationUID"] == {}
+    assert gliff._get_annotation_uid("project", uid_b, "alice") is None
+
+
+def test_project_is_fetched_again_after_a_failed_upload_or_a_refresh() -> None:
+    gliff = make_gliff()
+    project_manager = gliff.project.project_manager
+    uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)))
+    assert project_manager.fetches == 1
+
+    project_manager.failing_projects.add("project")
+    gliff.update_metadata_and_labels("project", uid_a, ["cat"])
+    project_manager.failing_projects.clear()
+    gliff.get_metadata_and_labels("project", uid_a)
+    assert project_manager.fetches == 2
+
+    gliff.refresh_project("project")
+    gliff.get_metadata_and_labels("project", uid_a)
+    assert project_manager.fetches == 3
+
+
+def test_batch_uploads_the_gallery_once_when_the_outermost_block_ends() -> None:
+    gliff = make_gliff()
+    uploads = gliff.project.project_manager.uploads
+
+    with gliff.batch():
+        uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)))
+        with gliff.batch():
+            uid_b = gliff.upload_image("project", "b", Image.new("RGB", (8, 8)))
+        assert uploads == []
+        gliff.update_metadata_and_labels("project", uid_a, ["cat"])
+        assert uploads == []
+
+    assert uploads == ["project"]
+    gallery = uploaded_gallery(gliff)
+    assert set(gallery) == {uid_a, uid_b}
+    assert gallery[uid_a]["imageLabels"] == ["cat"]
+
+
+def test_batch_discards_the_gallery_changes_on_error() -> None:
+    gliff = make_gliff()
+    project_manager = gliff.project.project_manager
+    uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)))
+
+    with pytest.raises(RuntimeError):
+        with gliff.batch():
+            uid_b = gliff.upload_image("project", "b", Image.new("RGB", (8, 8)))
+            raise RuntimeError("error in the block")
+
+    assert project_manager.uploads == ["project"]
+    assert not gliff.project._pending_galleries
+    # the project is fetched again, without the discarded tile
+    assert gliff.get_metadata_and_labels("project", uid_b) is None
+    assert gliff.get_metadata_and_labels("project", uid_a) is not None
+    assert project_manager.fetches == 2
+
+
+def test_failing_flush_is_logged_and_the_other_projects_are_uploaded() -> None:
+    gliff = make_gliff()
+    project_manager = gliff.project.project_manager
+    project_manager.failing_projects.add("stale")
+
+    with gliff.batch():
+        gliff.upload_image("stale", "a", Image.new("RGB", (8, 8)))
+        uid_b = gliff.upload_image("project", "b", Image.new("RGB", (8, 8)))
+
+    assert project_manager.uploads == ["project"]
+    assert set(uploaded_gallery(gliff)) == {uid_b}
+    assert not gliff.project._pending_galleries
+    assert "stale" not in gliff.project._projects
+
+
+def test_logout_uploads_the_pending_galleries() -> None:
+    gliff = make_gliff()
+    project_manager = gliff.project.project_manager
+
+    with gliff.batch():
+        uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)))
+        gliff.logout()
+        assert project_manager.uploads == ["project"]
+
+    assert project_manager.uploads == ["project"]
+    assert set(uploaded_gallery(gliff)) == {uid_a}
+
+
+def test_metadata_updates_reach_the_uploaded_tile() -> None:
+    gliff = make_gliff()
+    uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)), metadata={"source": "camera"})
+
+    gliff.update_metadata_and_labels("project", uid_a, metadata={"reviewed": True})
+    gliff.upload_annotation("project", uid_a, "alice", [gliff.create_annotation("paintbrush")], {"annotator": "alice"})
+
+    file_info = uploaded_gallery(gliff)[uid_a]["fileInfo"]
+    assert file_info["source"] == "camera"
+    assert file_info["reviewed"] is True
+    assert file_info["annotator"] == "alice"
+
+
+def test_update_only_replaces_an_empty_last_annotation() -> None:
+    gliff = make_gliff()
+    uid_a = gliff.upload_image("project", "a", Image.new("RGB", (8, 8)))
+    empty = gliff.create_annotation("paintbrush")
+    first = gliff.create_annotation("paintbrush", brush_strokes=[gliff.create_brush_stroke([1, 2, 3, 4])])
+    second = gliff.create_annotation("spline", spline=gliff.create_spline([gliff.create_xypoint(1, 2)]))
+
+    gliff.upload_annotation("project", uid_a, "alice", [empty])
+    gliff.upload_annotation("project", uid_a, "alice", [first])
+    assert gliff.get_annotations("project", uid_a, "alice") == [first]
+
+    gliff.upload_annotation("project", uid_a, "alice", [second])
+    assert gliff.get_annotations("project", uid_a, "alice") == [first, second]
+
+
+def test_upload_images_uses_one_transaction_and_one_gallery_upload() -> None:
+    gliff = make_gliff()
+    project_manager = gliff.project.project_manager
+
+    uids = gliff.upload_images(
+        "project",
+        [
+            {"name": "a", "image": Image.new("RGB", (8, 8)), "image_labels": ["cat"]},
+            {"name": "b", "image": Image.new("L", (4, 6)), "metadata": {"source": "camera"}},
+            {"name": "c", "image": bytes(2 * 3 * 3), "mode": "RGB", "size": (2, 3)},
+        ],
+    )
+
+    assert len(uids) == 3
+    assert project_manager.item_manager.transactions == 1
+    assert project_manager.uploads == ["project"]
+    gallery = uploaded_gallery(gliff)
+    assert [gallery[uid]["fileInfo"]["imageName"] for uid in uids] == ["a", "b", "c"]
+    assert gallery[uids[0]]["imageLabels"] == ["cat"]
+    assert gallery[uids[1]]["fileInfo"]["height"] == 6
+    assert gallery[uids[1]]["fileInfo"]["source"] == "camera"
+
+
+def test_upload_images_with_no_images_uploads_nothing() -> None:
+    gliff = make_gliff()
+    project_manager = gliff.project.project_manager
+
+    assert gliff.upload_images("project", []) == []
+    assert project_manager.item_manager.transactions == 0
+    assert project_manager.uploads == []
+
+
+def test_upload_images_skips_invalid_entries() -> None:
+    gliff = make_gliff()
+
+    uids = gliff.upload_images(
+        "project",
+        [
+            {"image": Image.new("RGB", (8, 8))},
+            {"name": "typo", "image": Image.new("RGB", (8, 8)), "metdata": {"source": "camera"}},
+            {"name": "ok", "image": Image.new("RGB", (8, 8))},
+        ],
+    )
+
+    assert uids[:2] == [None, None]
+    assert set(uploaded_gallery(gliff)) == {uids[2]}
+
+
+def test_least_recently_used_projects_are_dropped() -> None:
+    gliff = make_gliff()
+    project = gliff.project
+
+    for uid in ["p0", "p1", "p2", "p3", "p0", "p4"]:
+        project._fetch_project_data(uid)
+
+    assert list(project._projects) == ["p2", "p3", "p0", "p4"]
+    assert project.project_manager.fetches == 5
+
+
+def test_projects_with_pending_galleries_are_kept() -> None:
+    gliff = make_gliff()
+    project = gliff.project
+
+    with gliff.batch():
+        uid_a = gliff.upload_image("p0", "a", Image.new("RGB", (8, 8)))
+        for uid in ["p1", "p2", "p3", "p4", "p5"]:
+            project._fetch_project_data(uid)
+        assert "p0" in project._projects
+
+    assert set(uploaded_gallery(gliff, "p0")) == {uid_a}
+
+
+def decode_thumbnail(thumbnail: str) -> Image.Image:
+    return Image.open(BytesIO(b64decode(thumbnail.split(",", 1)[1])))
+
+
+def test_thumbnail_size_matches_image_thumbnail() -> None:
+    rng = random.Random(0)
+    sizes = [(1735, 1186), (128, 128), (100, 50), (1, 4000)]
+    sizes += [(rng.randint(1, 4000), rng.randint(1, 4000)) for _ in range(1000)]
+    for size in sizes:
+        expected = Image.new("L", size)
+        expected.thumbnail((128, 128))
+        assert Gliff._get_thumbnail_size(size) == expected.size
+
+    # for JPEGs, the thumbnail size is computed before the image is drafted
+    jpeg = BytesIO()
+    Image.new("RGB", (1735, 1186)).save(jpeg, format="JPEG")
+    gliff = make_gliff()
+    uid_a = gliff.upload_image("project", "a", b64encode_as_string(jpeg.getvalue()))
+    assert decode_thumbnail(uploaded_gallery(gliff)[uid_a]["thumbnail"]).size == (128, 88)
+
+
+def test_gallery_tile_index_follows_list_changes() -> None:
+    def tiles(*ids: str) -> List[Dict[str, Any]]:
+        return [{"id": id} for id in ids]
+
+    def expected_index(gallery: Gallery) -> Dict[str, int]:
+        index: Dict[str, int] = {}
+        for i, tile in enumerate(gallery):
+            index.setdefault(tile["id"], i)
+        return index
+
+    # the first tile with a duplicated id is the one indexed
+    gallery = Gallery(tiles("a", "b", "a"))
+    assert isinstance(gallery, list)
+    assert dict(gallery.tile_index) == {"a": 0, "b": 1}
+    with pytest.raises(TypeError):
+        gallery.tile_index["c"] = 3  # type: ignore[index]
+
+    changes: List[Callable[[Gallery], Any]] = [
+        lambda g: g.append({"id": "b"}),
+        lambda g: g.append({"id": "c"}),
+        lambda g: g.extend(tiles("d", "a")),
+        lambda g: g.__iadd__(tiles("e")),
+        lambda g: g.insert(0, {"id": "f"}),
+        lambda g: g.pop(0),
+        lambda g: g.pop(),
+        lambda g: g.remove(g[0]),
+        lambda g: g.__setitem__(0, {"id": "g"}),
+        lambda g: g.__setitem__(slice(1, 3), tiles("h", "c", "i")),
+        lambda g: g.__delitem__(slice(0, 2)),
+        lambda g: g.reverse(),
+        lambda g: g.sort(key=lambda tile: tile["id"]),
+        lambda g: g.__imul__(2),
+        lambda g: g.clear(),
+    ]
+    for change in changes:
+        change(gallery)
+        assert dict(gallery.tile_index) == expected_index(gallery)
+    gallery += tiles("j")
+    assert isinstance(gallery, Gallery)
+    assert dict(gallery.tile_index) == {"j": 0}
+
+
+def test_upload_image_rejects_short_raw_buffer() -> None:
+    gliff = make_gliff()
+
+    assert gliff.upload_image("project", "short", bytes(3), mode="RGB", size=(2, 3)) is None
+    uid = gliff.upload_image("project", "raw", bytes(18), mode="RGB", size=(2, 3))
+
+    assert set(uploaded_gallery(gliff)) == {uid}
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "LA", "P"])
+def test_transparent_thumbnail_areas_are_white(mode: str) -> None:
+    image = Image.new("RGBA", (256, 256), (0, 0, 0, 0))
+    image.paste((255, 0, 0, 255), (0, 0, 128, 256))
+    if mode == "LA":
+        image = image.convert("LA")
+    elif mode == "P":
+        image = image.convert("P")
+        image.info["transparency"] = image.getpixel((255, 0))
+    png = BytesIO()
+    image.save(png, format="PNG")
+    gliff = make_gliff()
+
+    uid_pil = gliff.upload_image("project", "pil", image)
+    uid_png = gliff.upload_image("project", "png", png.getvalue())
+
+    for uid in [uid_pil, uid_png]:
+        thumbnail = decode_thumbnail(uploaded_gallery(gliff)[uid]["thumbnail"]).convert("RGB")
+        assert min(thumbnail.getpixel((120, 64))) > 240
+        assert min(thumbnail.getpixel((8, 64))) < 100